@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db.models import Count, DateTimeField, Max, Value
+
+from recipes.models import Recipe
+
+RECIPE_PAYLOAD_KEY = 'recipe-payload:{}:{}:{}'
+RECIPE_USER_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def get_stamps(querysets):
+    queries = []
+    for index, queryset in enumerate(querysets):
+        has_updated = any(
+            field.name == 'updated'
+            for field in queryset.model._meta.concrete_fields
+        )
+        queries.append(queryset.order_by().values(
+            source=Value(index)
+        ).annotate(
+            count=Count('pk'),
+            last_pk=Max('pk'),
+            last_updated=(
+                Max('updated') if has_updated
+                else Value(None, output_field=DateTimeField())
+            ),
+        ))
+    first, *others = queries
+    rows = first.union(*others, all=True) if others else first
+    return [
+        (row['count'], row['last_pk'], row['last_updated'])
+        for row in sorted(rows, key=lambda row: row['source'])
+    ]
+
+
+def touch_recipe(recipe_id):
+    Recipe.objects.filter(pk=recipe_id).touch()
+
+
+def touch_author(author_id):
+    Recipe.objects.filter(author_id=author_id).touch()
+
+
+def get_recipe_payloads(recipes, build_payload, request):
+    origin = request.build_absolute_uri('/') if request else ''
+    keys = {
+        recipe.pk: RECIPE_PAYLOAD_KEY.format(
+            recipe.pk, recipe.updated.isoformat(), origin
+        )
+        for recipe in recipes
+    }
+    cached = cache.get_many(keys.values())
+    payloads = {}
+    missing = {}
+    for recipe in recipes:
+        key = keys[recipe.pk]
+        if key in cached:
+            payloads[recipe.pk] = cached[key]
+            continue
+        payload = build_payload(recipe)
+        for field in RECIPE_USER_FIELDS:
+            payload.pop(field, None)
+        payload['author'].pop('is_subscribed', None)
+        payloads[recipe.pk] = missing[key] = payload
+    if missing:
+        cache.set_many(missing)
+    return payloads
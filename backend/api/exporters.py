@@ -0,0 +1,90 @@
+import csv
+import json
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 18
+PDF_MARGIN = 50
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def shopping_list_rows(user):
+    return user.shopping_list.order_by(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).values_list(
+        'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ).iterator(chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE)
+
+
+def export_txt(rows):
+    separator = ''
+    for _, name, measurement_unit, amount in rows:
+        yield f'{separator}{name} = {amount} {measurement_unit}'
+        separator = '\n'
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def export_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for _, name, measurement_unit, amount in rows:
+        yield writer.writerow((name, amount, measurement_unit))
+
+
+def export_json(rows):
+    separator = ''
+    yield '['
+    for pk, name, measurement_unit, amount in rows:
+        yield separator + json.dumps({
+            'id': pk,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+def export_pdf(rows):
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, settings.PDF_FONT_PATH))
+    output = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    canvas = Canvas(output, pagesize=A4)
+    width, height = A4
+    y = height - PDF_MARGIN
+    canvas.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+    canvas.drawString(PDF_MARGIN, y, 'Список покупок')
+    y -= PDF_LINE_HEIGHT * 2
+    for _, name, measurement_unit, amount in rows:
+        if y < PDF_MARGIN:
+            canvas.showPage()
+            canvas.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        canvas.drawString(
+            PDF_MARGIN, y, f'{name} — {amount} {measurement_unit}'
+        )
+        y -= PDF_LINE_HEIGHT
+    canvas.showPage()
+    canvas.save()
+    output.seek(0)
+    return output
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'json': export_json,
+}
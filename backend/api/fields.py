@@ -1,14 +1,84 @@
 import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from rest_framework import serializers
 
+BASE64_CHUNK_SIZE = 64 * 1024
+
+
+class Base64UploadedFile(TemporaryUploadedFile):
+
+    def __del__(self):
+        self.close()
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректное изображение в формате base64.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode_base64(data)
+        if getattr(data, 'size', 0) > settings.MAX_IMAGE_UPLOAD_SIZE:
+            self.fail('too_large', max_size=settings.MAX_IMAGE_UPLOAD_SIZE)
 
         return super().to_internal_value(data)
+
+    def decode_base64(self, data):
+        format, separator, imgstr = data.partition(';base64,')
+        if not separator or not imgstr:
+            self.fail('invalid_base64')
+        if len(imgstr) // 4 * 3 > settings.MAX_IMAGE_UPLOAD_SIZE:
+            self.fail('too_large', max_size=settings.MAX_IMAGE_UPLOAD_SIZE)
+        ext = format.split('/')[-1]
+        image = Base64UploadedFile(
+            'temp.' + ext, format[len('data:'):], 0, None
+        )
+        try:
+            for start in range(0, len(imgstr), BASE64_CHUNK_SIZE):
+                image.write(base64.b64decode(
+                    imgstr[start:start + BASE64_CHUNK_SIZE], validate=True
+                ))
+        except binascii.Error:
+            image.close()
+            self.fail('invalid_base64')
+        image.size = image.tell()
+        image.seek(0)
+        return image
+
+
+class InBulkRelatedField(serializers.ManyRelatedField):
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(
+            child_relation=serializers.PrimaryKeyRelatedField(
+                queryset=queryset
+            ),
+            **kwargs
+        )
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        pks = []
+        for pk in data:
+            if isinstance(pk, bool):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+            try:
+                pks.append(int(pk))
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+        existing = self.context.get(self.field_name)
+        if existing is None:
+            existing = child.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in existing:
+                child.fail('does_not_exist', pk_value=pk)
+        return [existing[pk] for pk in pks]
@@ -1,6 +1,8 @@
 from django_filters.rest_framework import (BooleanFilter, CharFilter,
                                            FilterSet,
                                            ModelMultipleChoiceFilter)
+
+from api.search import search_queryset
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -17,6 +19,10 @@ class RecipeFilter(FilterSet):
         to_field_name='slug',
         conjoined=False
     )
+    search = CharFilter(method='search_filter')
+
+    def search_filter(self, queryset, name, value):
+        return search_queryset(queryset, 'name', value)
 
     def recipe_in_shopping_cart_filter(self, queryset, name, value):
         if value:
@@ -32,14 +38,20 @@ class RecipeFilter(FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'tags', 'is_in_shopping_cart', 'author')
+        fields = (
+            'is_favorited', 'tags', 'is_in_shopping_cart', 'author', 'search'
+        )
 
 
 class IngredientFilter(FilterSet):
     name = CharFilter(
         lookup_expr='istartswith'
     )
+    search = CharFilter(method='search_filter')
+
+    def search_filter(self, queryset, name, value):
+        return search_queryset(queryset, 'name', value)
 
     class Meta:
         model = Ingredient
-        fields = ('name',)
+        fields = ('name', 'search')
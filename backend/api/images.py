@@ -0,0 +1,124 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from PIL import Image, ImageOps
+
+VARIANTS_DIR = 'variants'
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+
+logger = logging.getLogger(__name__)
+executor = None
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_VARIANTS_WORKERS
+        )
+    return executor
+
+
+def get_variant_name(source_name, variant):
+    base, _ = os.path.splitext(source_name)
+    return f'{VARIANTS_DIR}/{base}_{variant}.{VARIANT_EXTENSION}'
+
+
+def get_variant_names(source_name):
+    return [
+        get_variant_name(source_name, variant)
+        for variant in settings.IMAGE_VARIANTS
+    ]
+
+
+def render_variants(source_path, source_name, media_root, sizes, quality):
+    variants = {'source': source_name}
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for variant, size in sizes.items():
+            name = get_variant_name(source_name, variant)
+            path = os.path.join(media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            resized = image.copy()
+            resized.thumbnail(size)
+            resized.save(path, VARIANT_FORMAT, quality=quality)
+            variants[variant] = name
+    return variants
+
+
+def variants_ready(file, variants):
+    return bool(file) and variants.get('source') == file.name
+
+
+def get_render_job(file):
+    return partial(
+        render_variants,
+        file.path,
+        file.name,
+        settings.MEDIA_ROOT,
+        settings.IMAGE_VARIANTS,
+        settings.IMAGE_VARIANTS_QUALITY,
+    )
+
+
+def save_variants(model, pk, field, variants_field, variants, on_ready):
+    updated = model.objects.filter(
+        pk=pk, **{field: variants['source']}
+    ).update(**{variants_field: variants})
+    if updated:
+        on_ready()
+
+
+def schedule_variants(instance, field, variants_field, on_ready):
+    file = getattr(instance, field)
+    if not file or variants_ready(file, getattr(instance, variants_field)):
+        return
+    job = get_render_job(file)
+    save = partial(
+        save_variants, type(instance), instance.pk, field, variants_field,
+        on_ready=on_ready
+    )
+    transaction.on_commit(partial(submit_job, job, save))
+
+
+def submit_job(job, save):
+    if not settings.IMAGE_VARIANTS_WORKERS:
+        save(job())
+        return
+    get_executor().submit(job).add_done_callback(
+        partial(save_finished_job, save)
+    )
+
+
+def save_finished_job(save, future):
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось подготовить варианты изображения',
+            exc_info=future.exception()
+        )
+        return
+    close_old_connections()
+    try:
+        save(future.result())
+    finally:
+        connection.close()
+
+
+def get_variant_urls(file, variants, request=None):
+    if not file:
+        return None
+    ready = variants_ready(file, variants)
+    urls = {}
+    for variant in settings.IMAGE_VARIANTS:
+        url = (
+            file.storage.url(variants[variant])
+            if ready and variant in variants else file.url
+        )
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
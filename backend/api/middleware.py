@@ -0,0 +1,125 @@
+import json
+import logging
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+TOP_QUERIES_COUNT = 5
+
+logger = logging.getLogger(__name__)
+request_timings = ContextVar('request_timings', default=None)
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestTimings:
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.db = 0.0
+        self.query_count = 0
+        self.queries = {}
+        self.serialize = 0.0
+        self.handler_started = None
+        self.handler_db = 0.0
+        self.render = 0.0
+        self.render_started = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - started
+            self.db += duration
+            self.query_count += 1
+            stats = self.queries.setdefault(sql, [0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+
+    def start_handler(self):
+        self.handler_started = perf_counter()
+        self.handler_db = self.db
+
+    def finish_handler(self):
+        if self.handler_started is None:
+            return
+        self.serialize += (
+            perf_counter() - self.handler_started
+            - (self.db - self.handler_db)
+        )
+        self.handler_started = None
+
+    def finish_render(self, response):
+        self.render += perf_counter() - self.render_started
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={milliseconds(self.db)};'
+            f'desc="queries={self.query_count}"',
+            f'serialize;dur={milliseconds(self.serialize)}',
+            f'render;dur={milliseconds(self.render)}',
+            f'total;dur={milliseconds(total)}',
+        ))
+
+    def report(self, request, response, total):
+        top_queries = sorted(
+            self.queries.items(), key=lambda item: item[1][1], reverse=True
+        )[:TOP_QUERIES_COUNT]
+        return {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': milliseconds(total),
+            'db_ms': milliseconds(self.db),
+            'queries': self.query_count,
+            'serialize_ms': milliseconds(self.serialize),
+            'render_ms': milliseconds(self.render),
+            'top_queries': [
+                {'sql': sql, 'count': count, 'ms': milliseconds(duration)}
+                for sql, (count, duration) in top_queries
+            ],
+        }
+
+
+class PerformanceTimingMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(
+                            timings.record_query
+                        )
+                    )
+                response = self.get_response(request)
+        finally:
+            request_timings.reset(token)
+        total = perf_counter() - timings.started
+        response['Server-Timing'] = timings.server_timing(total)
+        if milliseconds(total) >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            logger.warning('Медленный запрос: %s', json.dumps(
+                timings.report(request, response, total), ensure_ascii=False
+            ))
+        return response
+
+    def process_template_response(self, request, response):
+        timings = request_timings.get()
+        if timings is not None:
+            timings.render_started = perf_counter()
+            response.add_post_render_callback(timings.finish_render)
+        return response
@@ -0,0 +1,64 @@
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+
+from api.cache import get_stamps
+from api.middleware import request_timings
+
+
+class ServerTimingMixin:
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.start_handler()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timings = request_timings.get()
+        if timings is not None:
+            timings.finish_handler()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+
+    def get_stamp_sources(self, request):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        sources = self.get_stamp_sources(request)
+        if not sources:
+            return handler(request, *args, **kwargs)
+        self.stamps = get_stamps(sources)
+        etag = quote_etag(md5('|'.join((
+            request.get_full_path(),
+            request.get_host(),
+            request.META.get('HTTP_ACCEPT', ''),
+            str(request.user.pk),
+            *map(str, self.stamps),
+        )).encode()).hexdigest())
+        last_modified = self.stamps[0][2]
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (HTTP_200_OK, HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(
+                    last_modified.timestamp()
+                )
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
@@ -1,4 +1,16 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination, _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.models import FeedEntry, older_than
 
 PAGE_PAGINATION_SIZE = 6
 
@@ -6,3 +18,89 @@ PAGE_PAGINATION_SIZE = 6
 class PagePagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = PAGE_PAGINATION_SIZE
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class LimitPagination(LimitOffsetPagination):
+    max_limit = settings.MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = PAGE_PAGINATION_SIZE
+    max_page_size = settings.MAX_PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        results = self.get_results(
+            queryset, self.decode_cursor(request), self.page_size + 1
+        )
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_results(self, queryset, position, limit):
+        queryset = queryset.order_by('-created', '-id')
+        if position is not None:
+            queryset = queryset.filter(older_than(position))
+        return list(queryset[:limit])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(last.created, last.id),
+        )
+
+    def encode_cursor(self, created, pk):
+        return b64encode(
+            f'{created.isoformat()}|{pk}'.encode(), altchars=b'-_'
+        ).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created, pk = b64decode(
+                encoded.encode(), altchars=b'-_', validate=True
+            ).decode().split('|')
+            created = parse_datetime(created)
+            pk = int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created, pk
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+
+    def get_results(self, queryset, position, limit):
+        recipe_ids = FeedEntry.objects.timeline(
+            self.request.user, position, limit
+        )
+        recipes = queryset.in_bulk(recipe_ids)
+        return [recipes[pk] for pk in recipe_ids if pk in recipes]
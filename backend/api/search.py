@@ -0,0 +1,126 @@
+import json
+import re
+from bisect import bisect_left, bisect_right
+
+from django.db import connection, connections
+from django.db.models import (Case, CharField, FloatField, Func, Lookup,
+                              Value, When)
+from django.db.models.functions import Greatest
+
+from recipes.models import Ingredient, Recipe
+
+PREFIX_UPPER_BOUND = chr(0x10FFFF)
+SIMILARITY_THRESHOLD = 0.3
+WORD_SIMILARITY_THRESHOLD = 0.6
+WORD_PATTERN = re.compile(r'\w+')
+TRIGRAM_INDEXES_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} '
+    "USING gin ((TRANSLATE(LOWER({column}), 'ё', 'е')) gin_trgm_ops)",
+)
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е')
+
+
+def trigrams(text):
+    grams = set()
+    for word in WORD_PATTERN.findall(normalize(text)):
+        padded = f'  {word} '
+        grams.update(
+            padded[index:index + 3] for index in range(len(padded) - 2)
+        )
+    return grams
+
+
+class SearchTextField(CharField):
+    pass
+
+
+@SearchTextField.register_lookup
+class TrigramMatch(Lookup):
+    lookup_name = 'trigram_match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (
+            f'({lhs} %% {rhs} OR {rhs} <%% {lhs})',
+            [*lhs_params, *rhs_params, *rhs_params, *lhs_params]
+        )
+
+
+class SearchText(Func):
+    template = "TRANSLATE(LOWER(%(expressions)s), 'ё', 'е')"
+    output_field = SearchTextField()
+
+
+class IngredientPrefixIndex:
+
+    def __init__(self):
+        self.snapshot = (None, [], [])
+
+    def get_snapshot(self, version):
+        if version != self.snapshot[0]:
+            self.snapshot = self.build(version)
+        return self.snapshot
+
+    def build(self, version):
+        rows = sorted(
+            (normalize(name), json.dumps(
+                {'name': name, 'id': pk, 'measurement_unit': unit},
+                ensure_ascii=False
+            ))
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        return (
+            version,
+            [key for key, _ in rows],
+            [fragment for _, fragment in rows],
+        )
+
+    def search(self, version, prefix=''):
+        _, keys, fragments = self.get_snapshot(version)
+        prefix = normalize(prefix)
+        found = fragments[
+            bisect_left(keys, prefix):
+            bisect_right(keys, prefix + PREFIX_UPPER_BOUND)
+        ]
+        return '[' + ','.join(reversed(found)) + ']'
+
+
+ingredient_index = IngredientPrefixIndex()
+
+
+def create_trigram_indexes(sender, using, **kwargs):
+    if connections[using].vendor != 'postgresql':
+        return
+    with connections[using].cursor() as cursor:
+        for model in (Ingredient, Recipe):
+            for sql in TRIGRAM_INDEXES_SQL:
+                cursor.execute(sql.format(
+                    table=model._meta.db_table, column='name'
+                ))
+
+
+def search_queryset(queryset, field, query):
+    if connection.vendor == 'postgresql':
+        query = normalize(query)
+        return queryset.annotate(
+            search_text=SearchText(field)
+        ).filter(
+            search_text__trigram_match=query
+        ).annotate(
+            search_rank=Greatest(
+                Func('search_text', Value(query), function='SIMILARITY'),
+                Func(Value(query), 'search_text', function='WORD_SIMILARITY'),
+                output_field=FloatField(),
+            )
+        ).order_by('-search_rank', 'pk')
+    return queryset.filter(**{f'{field}__icontains': query}).order_by(
+        Case(When(**{f'{field}__istartswith': query}, then=0), default=1),
+        field, 'pk'
+    )
@@ -1,35 +1,71 @@
+import json
+from collections import Counter
+from functools import partial
+
 from djoser.serializers import UserCreateSerializer
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connection, transaction
+from django.db.models import F, Manager
+from django.http import QueryDict
 from rest_framework import serializers
-
-from api.fields import Base64ImageField
-from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
-                            ShoppingCart, Tag)
+from rest_framework.settings import api_settings
+
+from api.cache import get_recipe_payloads, touch_recipe
+from api.fields import Base64ImageField, InBulkRelatedField
+from api.images import get_variant_urls, schedule_variants
+from recipes.models import (Favorite, FeedEntry, Ingredient,
+                            IngredientsInRecipe, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
 from users.models import Subscription, User
 
 MAX_VALUE = 32000
 MIN_VALUE = 1
 
 
+def get_ingredient_ids(recipes_data):
+    ingredient_ids = set()
+    for recipe_data in recipes_data:
+        if not isinstance(recipe_data, dict):
+            continue
+        for ingredient_data in recipe_data.get('ingredients') or ():
+            try:
+                ingredient_ids.add(int(ingredient_data['id']))
+            except (KeyError, TypeError, ValueError):
+                pass
+    return ingredient_ids
+
+
+def get_subscribed_author_ids(request):
+    if not hasattr(request, 'subscribed_author_ids'):
+        request.subscribed_author_ids = (
+            set(request.user.subscription_subscriber.values_list(
+                'author_id', flat=True
+            ))
+            if request.user.is_authenticated else set()
+        )
+    return request.subscribed_author_ids
+
+
 class UserProfileSerializer(UserCreateSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(use_url=True)
+    avatar_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'id', 'username', 'first_name',
             'last_name', 'email', 'avatar',
-            'is_subscribed'
+            'avatar_variants', 'is_subscribed'
         )
 
     def get_is_subscribed(self, data):
-        user = self.context['request'].user
+        return data.id in get_subscribed_author_ids(self.context['request'])
 
-        return (
-            user.is_authenticated and user.subscription_subscriber.filter(
-                author=data.id
-            ).exists()
+    def get_avatar_variants(self, obj):
+        return get_variant_urls(
+            obj.avatar, obj.avatar_variants, self.context.get('request')
         )
 
 
@@ -60,18 +96,10 @@ class CreateUserProfileSerializer(UserProfileSerializer):
 
 
 class CreateSubscriptionSerializer(serializers.ModelSerializer):
-    recipes_count = serializers.ReadOnlyField(source='author.recipes.count')
-    recipes = serializers.ReadOnlyField(source='author.recipes.all')
 
     class Meta:
         model = Subscription
-        fields = (
-            'subscriber', 'recipes', 'author', 'recipes_count'
-        )
-        extra_kwargs = {
-            'author': {'write_only': True},
-            'subscriber': {'write_only': True}
-        }
+        fields = ('subscriber', 'author')
 
     def validate(self, attrs):
         if attrs['subscriber'] == attrs['author']:
@@ -82,11 +110,9 @@ class CreateSubscriptionSerializer(serializers.ModelSerializer):
         return attrs
 
     def to_representation(self, instance):
-        pk = UserProfileSerializer(
+        return SubscriptionSerializer(
             instance.author, context={'request': self.context['request']}
         ).data
-        pk.update(super().to_representation(instance))
-        return pk
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -119,35 +145,81 @@ class ShortIngredientsSerializer(serializers.ModelSerializer):
         fields = ('name', 'id', 'measurement_unit')
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ingredient.id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+def get_recipes_limit(request):
+    max_limit = settings.SUBSCRIPTION_RECIPES_MAX_LIMIT
+    try:
+        limit = max(int(request.query_params['recipes_limit']), 0)
+    except (KeyError, ValueError):
+        return max_limit
+    return min(limit, max_limit)
+
+
+def prefetch_latest_recipes(authors, request):
+    latest_recipes = {author.pk: [] for author in authors}
+    if latest_recipes:
+        for recipe in Recipe.objects.latest_by_author(
+            latest_recipes, get_recipes_limit(request)
+        ):
+            latest_recipes[recipe.author_id].append(recipe)
+    for author in authors:
+        author.latest_recipes = latest_recipes[author.pk]
+
+
+class SubscriptionListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        authors = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_latest_recipes(authors, self.context['request'])
+        return super().to_representation(authors)
+
+
 class SubscriptionSerializer(UserProfileSerializer):
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     recipes = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'id', 'username', 'first_name', 'last_name',
-            'email', 'avatar', 'is_subscribed', 'recipes',
-            'recipes_count'
+            'email', 'avatar', 'avatar_variants', 'is_subscribed',
+            'recipes', 'recipes_count'
         )
-
-    def get_recipes_count(self, obj):
-        return obj.authored_recipes.count()
+        list_serializer_class = SubscriptionListSerializer
 
     def get_recipes(self, obj):
         request = self.context['request']
-        recipes = obj.authored_recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        if not hasattr(obj, 'latest_recipes'):
+            prefetch_latest_recipes([obj], request)
         return ShortRecipeSertializer(
-            recipes, many=True, context={'request': request}
+            obj.latest_recipes, many=True, context={'request': request}
         ).data
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        payloads = get_recipe_payloads(
+            recipes, self.child.build_payload, self.context.get('request')
+        )
+        return [
+            self.child.add_user_fields(recipe, payloads[recipe.pk])
+            for recipe in recipes
+        ]
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     ingredients = IngredientSerializer(
         source='recipe_with_ingredients',
@@ -160,34 +232,61 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
-            'author', 'id', 'name', 'image', 'text', 'ingredients',
-            'is_favorited', 'cooking_time', 'is_in_shopping_cart',
-            'tags'
+            'author', 'id', 'name', 'image', 'image_variants', 'text',
+            'ingredients', 'is_favorited', 'cooking_time',
+            'is_in_shopping_cart', 'tags'
         )
+        list_serializer_class = RecipeListSerializer
 
     def to_representation(self, instance):
+        payloads = get_recipe_payloads(
+            [instance], self.build_payload, self.context.get('request')
+        )
+        return self.add_user_fields(instance, payloads[instance.pk])
+
+    def build_payload(self, instance):
         representation = super().to_representation(instance)
         representation['tags'] = TagSerializer(
             instance.tags.all(), many=True).data
 
         return representation
 
+    def add_user_fields(self, instance, payload):
+        payload['is_favorited'] = self.get_is_favorited(instance)
+        payload['is_in_shopping_cart'] = self.get_is_in_shopping_cart(
+            instance
+        )
+        payload['author']['is_subscribed'] = self.fields[
+            'author'
+        ].get_is_subscribed(instance.author)
+        return {name: payload[name] for name in self.Meta.fields}
+
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context['request']
         if request and request.user.is_authenticated:
             return request.user.shopping_cart.filter(recipe=obj).exists()
         return False
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return request.user.favorites.filter(recipe=obj).exists()
         return False
 
+    def get_image_variants(self, obj):
+        return get_variant_urls(
+            obj.image, obj.image_variants, self.context.get('request')
+        )
+
 
 class CreateShortIngredientsSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField()
@@ -201,30 +300,97 @@ class CreateShortIngredientsSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ('id', 'amount')
 
-    def validate_id(self, value):
-        try:
-            Ingredient.objects.get(id=value)
-        except Ingredient.DoesNotExist:
-            raise serializers.ValidationError(
-                f'Ингредиент с id {value} не существует'
-            )
-        return value
-
 
 class ShortRecipeSertializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('name', 'id', 'image', 'cooking_time')
+        fields = ('name', 'id', 'image', 'image_variants', 'cooking_time')
+
+    def get_image_variants(self, obj):
+        return get_variant_urls(
+            obj.image, obj.image_variants, self.context.get('request')
+        )
+
+
+class BulkCreateRecipeSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            if len(data) > settings.RECIPES_BULK_MAX_SIZE:
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Нельзя создать больше '
+                        f'{settings.RECIPES_BULK_MAX_SIZE} рецептов '
+                        'за один запрос'
+                    ]
+                }, code='max_length')
+            self.context['ingredients'] = Ingredient.objects.in_bulk(
+                get_ingredient_ids(data)
+            )
+            self.context['tags'] = Tag.objects.in_bulk()
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        author = self.context['request'].user
+        batch_size = settings.BULK_CREATE_BATCH_SIZE
+        recipes = [
+            Recipe(author=author, **{
+                field: value for field, value in recipe_data.items()
+                if field not in ('ingredients', 'tags')
+            })
+            for recipe_data in validated_data
+        ]
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+            else:
+                for recipe in recipes:
+                    recipe.save()
+            Recipe.objects.assign_short_codes(
+                [recipe for recipe in recipes if recipe.short_code is None],
+                batch_size=batch_size
+            )
+            if connection.features.can_return_rows_from_bulk_insert:
+                User.objects.filter(pk=author.pk).update(
+                    recipes_count=F('recipes_count') + len(recipes)
+                )
+                transaction.on_commit(
+                    partial(FeedEntry.objects.fan_out, recipes)
+                )
+                for recipe in recipes:
+                    schedule_variants(
+                        recipe, 'image', 'image_variants',
+                        partial(touch_recipe, recipe.pk)
+                    )
+            Recipe.tags.through.objects.bulk_create(
+                (
+                    Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+                    for recipe, recipe_data in zip(recipes, validated_data)
+                    for tag in recipe_data['tags']
+                ),
+                batch_size=batch_size
+            )
+            IngredientsInRecipe.objects.bulk_create(
+                (
+                    IngredientsInRecipe(
+                        recipe_id=recipe.pk,
+                        ingredient_id=ingredient['id'],
+                        amount=ingredient['amount']
+                    )
+                    for recipe, recipe_data in zip(recipes, validated_data)
+                    for ingredient in recipe_data['ingredients']
+                ),
+                batch_size=batch_size
+            )
+        return recipes
 
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
     ingredients = CreateShortIngredientsSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = InBulkRelatedField(queryset=Tag.objects.all())
     cooking_time = serializers.IntegerField(
         validators=[
             MinValueValidator(MIN_VALUE), MaxValueValidator(MAX_VALUE)
@@ -237,12 +403,32 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             'name', 'text', 'image', 'ingredients',
             'cooking_time', 'tags', 'id'
         )
+        list_serializer_class = BulkCreateRecipeSerializer
+
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_multipart(data)
+        return super().to_internal_value(data)
+
+    def parse_multipart(self, data):
+        parsed = data.dict()
+        for field in ('ingredients', 'tags'):
+            values = data.getlist(field)
+            if len(values) == 1:
+                try:
+                    decoded = json.loads(values[0])
+                except ValueError:
+                    decoded = values
+                if isinstance(decoded, list):
+                    values = decoded
+            if field in data:
+                parsed[field] = values
+        return parsed
 
     def validate_ingredients(self, value):
         if not value:
             raise serializers.ValidationError('Ингредиенты обязательны')
         ingredients = []
-        ingredient_ids = set()
         for ingredient_data in value:
             ingredient_id = ingredient_data.get('id')
             amount = ingredient_data.get('amount')
@@ -250,8 +436,30 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     'Укажите ID и количество ингредиента'
                 )
-            ingredient_ids.add(ingredient_id)
             ingredients.append({'id': ingredient_id, 'amount': amount})
+        ingredient_ids = Counter(
+            ingredient['id'] for ingredient in ingredients
+        )
+        existing = self.context.get('ingredients')
+        if existing is None:
+            existing = Ingredient.objects.in_bulk(ingredient_ids)
+        errors = []
+        missing = sorted(ingredient_ids.keys() - existing.keys())
+        if missing:
+            errors.append(
+                'Ингредиенты с id '
+                f'{", ".join(map(str, missing))} не существуют'
+            )
+        duplicates = sorted(
+            pk for pk, count in ingredient_ids.items() if count > 1
+        )
+        if duplicates:
+            errors.append(
+                'Ингредиенты с id '
+                f'{", ".join(map(str, duplicates))} повторяются'
+            )
+        if errors:
+            raise serializers.ValidationError(errors)
         return ingredients
 
     def validate_tags(self, tags):
@@ -268,6 +476,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
         return tags
 
+    @transaction.atomic
     def create(self, validated_data):
         user = self.context['request'].user
         ingredients_data = validated_data.pop('ingredients')
@@ -277,28 +486,61 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         self.create_ingredients(recipe, ingredients_data)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags_data = validated_data.pop('tags',)
-        IngredientsInRecipe.objects.filter(recipe=instance).delete()
-        self.create_ingredients(instance, validated_data.pop('ingredients'))
+        tags_data = validated_data.pop('tags', None)
+        ingredients_data = validated_data.pop('ingredients', None)
+        if (
+            ingredients_data is not None
+            and self.update_ingredients(instance, ingredients_data)
+        ):
+            ShoppingListItem.objects.rebuild_for_recipe(instance.pk)
 
         if tags_data is not None:
             instance.tags.set(tags_data)
 
         return super().update(instance, validated_data)
 
+    def update_ingredients(self, recipe, ingredients):
+        amounts = {
+            ingredient_data['id']: ingredient_data['amount']
+            for ingredient_data in ingredients
+        }
+        existing = {
+            item.ingredient_id: item
+            for item in IngredientsInRecipe.objects.filter(recipe=recipe)
+        }
+        to_delete = [
+            item.pk for ingredient_id, item in existing.items()
+            if ingredient_id not in amounts
+        ]
+        to_update = []
+        for ingredient_id, item in existing.items():
+            amount = amounts.get(ingredient_id, item.amount)
+            if amount != item.amount:
+                item.amount = amount
+                to_update.append(item)
+        to_create = [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if not (to_delete or to_update or to_create):
+            return False
+        IngredientsInRecipe.objects.filter(pk__in=to_delete).delete()
+        IngredientsInRecipe.objects.bulk_update(to_update, ['amount'])
+        self.create_ingredients(recipe, to_create)
+        return True
+
     def create_ingredients(self, recipe, ingredients):
-        ingredient_instances = []
-        for ingredient_data in ingredients:
-            ingredient = Ingredient.objects.get(id=ingredient_data['id'])
-            ingredient_instances.append(
-                IngredientsInRecipe(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    amount=ingredient_data['amount']
-                )
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_data['id'],
+                amount=ingredient_data['amount']
             )
-        IngredientsInRecipe.objects.bulk_create(ingredient_instances)
+            for ingredient_data in ingredients
+        )
 
 
 class UserRecipeSerializer:
@@ -0,0 +1,134 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from api.cache import touch_author, touch_recipe
+from api.images import schedule_variants
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.models import Subscription, User
+
+AUTHOR_FIELDS = (
+    'username', 'first_name', 'last_name', 'email', 'avatar',
+    'avatar_variants'
+)
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Subscription: (User, 'author_id', 'subscribers_count'),
+}
+
+
+def shift_counter(sender, instance, delta):
+    model, key, field = COUNTERS[sender]
+    rows = model.objects.filter(pk=getattr(instance, key))
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def increment_counter(sender, instance, created, **kwargs):
+    if created:
+        shift_counter(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def decrement_counter(sender, instance, **kwargs):
+    shift_counter(sender, instance, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(FeedEntry.objects.fan_out, [instance]))
+
+
+@receiver(post_save, sender=Recipe)
+def prepare_recipe_image(sender, instance, **kwargs):
+    schedule_variants(
+        instance, 'image', 'image_variants',
+        partial(touch_recipe, instance.pk)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_retagged_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not reverse:
+        return
+    if action == 'pre_clear':
+        Recipe.objects.filter(tags=instance).touch()
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).touch()
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def touch_tagged_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        Recipe.objects.filter(ingredients=instance).touch()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, update_fields=None,
+                      **kwargs):
+    if created:
+        return
+    if update_fields is None or not update_fields.isdisjoint(AUTHOR_FIELDS):
+        touch_author(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def prepare_avatar(sender, instance, **kwargs):
+    schedule_variants(
+        instance, 'avatar', 'avatar_variants',
+        partial(touch_author, instance.pk)
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    ShoppingListItem.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(
+            FeedEntry.objects.backfill,
+            instance.subscriber_id, instance.author_id
+        ))
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_feed(sender, instance, **kwargs):
+    FeedEntry.objects.forget_author(
+        instance.subscriber_id, instance.author_id
+    )
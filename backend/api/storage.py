@@ -0,0 +1,66 @@
+import hashlib
+import os
+from tempfile import NamedTemporaryFile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from recipes.models import Recipe
+from users.models import User
+
+BLOB_REFERENCES = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(
+            self.get_content_name(name, content), content, max_length
+        )
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + ext)
+
+    def get_available_name(self, name, max_length=None):
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(
+                f'Storage can not find an available filename for "{name}".'
+            )
+        return name
+
+    def _save(self, name, content):
+        try:
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        with NamedTemporaryFile(
+            dir=directory, prefix='.', delete=False
+        ) as temp:
+            try:
+                for chunk in content.chunks():
+                    temp.write(chunk)
+            except Exception:
+                os.unlink(temp.name)
+                raise
+        if self.file_permissions_mode is not None:
+            os.chmod(temp.name, self.file_permissions_mode)
+        os.replace(temp.name, full_path)
+        return name
@@ -0,0 +1,148 @@
+import os
+import time
+from base64 import b64encode
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+from PIL import Image
+
+from api.images import get_variant_names
+from recipes.management.client import get_client, perform
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+PREFIX = 'media_cleanup'
+COLORS = ('red', 'blue')
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def make_image(color):
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def encode_image(content):
+    return 'data:image/png;base64,' + b64encode(content).decode()
+
+
+def stored_files(media_root):
+    return {
+        os.path.relpath(
+            os.path.join(directory, name), media_root
+        ).replace(os.sep, '/')
+        for directory, _, names in os.walk(media_root)
+        for name in names
+        if not name.startswith('.')
+    }
+
+
+def referenced_files():
+    referenced = set()
+    for model, field in ((User, 'avatar'), (Recipe, 'image')):
+        for stored in model.objects.values_list(field, flat=True):
+            if stored:
+                referenced.update((stored, *get_variant_names(stored)))
+    return referenced
+
+
+def collect_garbage(min_age):
+    with redirect_stdout(StringIO()):
+        call_command('collect_media_garbage', min_age=min_age)
+
+
+class MediaCleanupTests(TransactionTestCase):
+
+    def setUp(self):
+        media_root = TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings = override_settings(
+            CACHES=DUMMY_CACHES,
+            MEDIA_ROOT=self.media_root,
+            IMAGE_VARIANTS_WORKERS=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create(
+            username=PREFIX,
+            email=f'{PREFIX}@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password=make_password(None),
+        )
+        self.client = get_client(self.user)
+
+    def test_replaced_and_deleted_files_are_collected(self):
+        first, second = (
+            encode_image(make_image(color)) for color in COLORS
+        )
+        tag = Tag.objects.create(name=PREFIX, slug=PREFIX)
+        ingredient = Ingredient.objects.create(
+            name=PREFIX, measurement_unit='г'
+        )
+        avatar = '/api/users/me/avatar/'
+        self.step('загрузка аватара', 'PUT', avatar, {'avatar': first})
+        self.step('замена аватара', 'PUT', avatar, {'avatar': second})
+        self.step('удаление аватара', 'DELETE', avatar)
+        recipe = {
+            'ingredients': [{'id': ingredient.pk, 'amount': 1}],
+            'tags': [tag.pk],
+            'image': first,
+            'name': PREFIX,
+            'text': PREFIX,
+            'cooking_time': 1,
+        }
+        recipe_id = self.step(
+            'создание рецепта', 'POST', '/api/recipes/', recipe
+        ).json()['id']
+        self.step(
+            'замена фото рецепта', 'PATCH', f'/api/recipes/{recipe_id}/',
+            {**recipe, 'image': second}
+        )
+        self.step('удаление рецепта', 'DELETE', f'/api/recipes/{recipe_id}/')
+
+    def test_reused_blob_survives_collection(self):
+        content = make_image(COLORS[0])
+        name = default_storage.save('recipes/images/orphan.png',
+                                    ContentFile(content))
+        expired = time.time() - 2 * 3600
+        os.utime(default_storage.path(name), (expired, expired))
+        self.assertEqual(
+            default_storage.save('recipes/images/reused.png',
+                                 ContentFile(content)),
+            name
+        )
+        collect_garbage(min_age=3600)
+        self.assertTrue(default_storage.exists(name))
+        collect_garbage(min_age=0)
+        self.assertFalse(default_storage.exists(name))
+
+    def step(self, name, method, path, data=None):
+        response = perform(self.client, method, path, data)
+        if response.status_code >= 400:
+            self.fail(
+                f'{name}: ответ {response.status_code} '
+                f'{response.content[:500].decode(errors="replace")}'
+            )
+        referenced = referenced_files()
+        collect_garbage(min_age=0)
+        stored = stored_files(self.media_root)
+        self.assertEqual(
+            stored - referenced, set(),
+            f'{name}: остались файлы без ссылок'
+        )
+        self.assertEqual(
+            referenced - stored, set(),
+            f'{name}: удалены файлы, на которые есть ссылки'
+        )
+        return response
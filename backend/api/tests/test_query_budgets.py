@@ -0,0 +1,356 @@
+from tempfile import TemporaryDirectory
+from urllib.parse import urlsplit
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from recipes.management.client import get_client, perform
+from recipes.models import (Favorite, FeedEntry, Ingredient,
+                            IngredientsInRecipe, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
+from users.models import Subscription, User
+
+PREFIX = 'query_budget'
+PASSWORD = 'query-budget-password'
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAAC'
+    'VBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAA'
+    'ggCByxOyYQAAAABJRU5ErkJggg=='
+)
+SIZES = (2, 10)
+SAVEPOINT_PREFIXES = (
+    'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'
+)
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+QUERY_BUDGETS = {
+    'users.list': 4,
+    'users.retrieve': 3,
+    'users.me': 2,
+    'users.create': 3,
+    'users.subscriptions': 5,
+    'users.subscribe': 7,
+    'users.unsubscribe': 7,
+    'users.avatar': 4,
+    'users.delete_avatar': 4,
+    'users.set_password': 4,
+    'tags.list': 2,
+    'tags.retrieve': 2,
+    'tags.create': 4,
+    'tags.update': 6,
+    'tags.destroy': 6,
+    'ingredients.list': 2,
+    'ingredients.search': 2,
+    'ingredients.retrieve': 2,
+    'recipes.list.anonymous': 5,
+    'recipes.list': 7,
+    'recipes.list.filters': 9,
+    'recipes.list.cursor': 6,
+    'recipes.list.cursor.next': 6,
+    'recipes.retrieve': 6,
+    'recipes.create': 12,
+    'recipes.update': 11,
+    'recipes.partial_update': 11,
+    'recipes.destroy': 12,
+    'recipes.bulk': 8,
+    'recipes.favorite': 5,
+    'recipes.favorite.delete': 4,
+    'recipes.shopping_cart': 9,
+    'recipes.shopping_cart.delete': 8,
+    'recipes.download_shopping_cart': 2,
+    'recipes.shopping_list': 2,
+    'recipes.feed': 7,
+    'recipes.export': 5,
+    'recipes.get_link': 2,
+    'recipes.get_links': 2,
+}
+SAVE_LOOP_ACTIONS = {'recipes.bulk': (5, 3)}
+
+
+def get_budget(name, size):
+    if (
+        name in SAVE_LOOP_ACTIONS
+        and not connection.features.can_return_rows_from_bulk_insert
+    ):
+        fixed, per_object = SAVE_LOOP_ACTIONS[name]
+        return fixed + per_object * size
+    return QUERY_BUDGETS[name]
+
+
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        media_root = TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(
+            CACHES=DUMMY_CACHES, MEDIA_ROOT=media_root.name
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_query_budgets(self):
+        runs = {}
+        for size in SIZES:
+            with transaction.atomic():
+                self.queries = {}
+                self.run_actions(self.create_fixture(size), size)
+                runs[size] = self.queries
+                transaction.set_rollback(True)
+        small, large = (runs[size] for size in SIZES)
+        for name, queries in large.items():
+            with self.subTest(name):
+                listing = '\n'.join(
+                    f'    {number}. {sql}'
+                    for number, sql in enumerate(queries, 1)
+                )
+                budget = get_budget(name, SIZES[-1])
+                self.assertLessEqual(
+                    len(queries), budget,
+                    f'{name}: {len(queries)} при бюджете {budget}\n{listing}'
+                )
+                if (
+                    name in SAVE_LOOP_ACTIONS
+                    and budget != QUERY_BUDGETS[name]
+                ):
+                    continue
+                self.assertLessEqual(
+                    len(queries), len(small[name]),
+                    f'{name}: растёт с объёмом данных: '
+                    f'{len(small[name])} → {len(queries)}\n{listing}'
+                )
+
+    def create_fixture(self, size):
+        password = make_password(None)
+        reader, other, *authors = (
+            User.objects.create(
+                username=f'{PREFIX}_{number}',
+                email=f'{PREFIX}_{number}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=make_password(PASSWORD) if number == 0 else password,
+            )
+            for number in range(size + 2)
+        )
+        tags = [
+            Tag.objects.create(
+                name=f'{PREFIX} {number}', slug=f'{PREFIX}_{number}'
+            )
+            for number in range(size)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'{PREFIX} {number}', measurement_unit='г'
+            )
+            for number in range(size)
+        ]
+        recipes = {}
+        for author in (other, *authors):
+            recipes[author] = [
+                Recipe.objects.create(
+                    author=author,
+                    name=f'{PREFIX} {number}',
+                    text=PREFIX,
+                    cooking_time=number + 1,
+                )
+                for number in range(size)
+            ]
+            for recipe in recipes[author]:
+                recipe.tags.set(tags)
+                IngredientsInRecipe.objects.bulk_create(
+                    IngredientsInRecipe(
+                        recipe=recipe, ingredient=ingredient, amount=number + 1
+                    )
+                    for number, ingredient in enumerate(ingredients)
+                )
+        for author in authors:
+            Subscription.objects.create(subscriber=reader, author=author)
+            FeedEntry.objects.backfill(reader.pk, author.pk)
+            for model in (Favorite, ShoppingCart):
+                model.objects.bulk_create(
+                    model(user=reader, recipe=recipe)
+                    for recipe in recipes[author]
+                )
+        ShoppingListItem.objects.rebuild([reader.pk])
+        return {
+            'reader': reader,
+            'other': other,
+            'author': authors[0],
+            'tags': tags,
+            'ingredients': ingredients,
+            'recipe': recipes[authors[0]][0],
+            'spare_recipe': recipes[other][0],
+            'recipe_ids': [
+                recipe.pk
+                for author_recipes in recipes.values()
+                for recipe in author_recipes
+            ],
+        }
+
+    def measure(self, name, client, method, path, data=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = perform(client, method, path, data)
+        if response.status_code >= 400:
+            self.fail(
+                f'{name}: ответ {response.status_code} '
+                f'{response.content[:500].decode(errors="replace")}'
+            )
+        self.queries[name] = [
+            query['sql'] for query in captured.captured_queries
+            if not query['sql'].startswith(SAVEPOINT_PREFIXES)
+        ]
+        return response
+
+    def recipe_data(self, fixture, name):
+        return {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10}
+                for ingredient in fixture['ingredients']
+            ],
+            'tags': [tag.pk for tag in fixture['tags']],
+            'image': IMAGE,
+            'name': name,
+            'text': PREFIX,
+            'cooking_time': 5,
+        }
+
+    def run_actions(self, fixture, size):
+        anonymous = get_client()
+        client = get_client(fixture['reader'])
+        author = fixture['author'].pk
+        other = fixture['other'].pk
+        recipe = fixture['recipe'].pk
+        spare = fixture['spare_recipe'].pk
+        tag = fixture['tags'][0]
+        ingredient = fixture['ingredients'][0].pk
+        recipes = '/api/recipes/'
+
+        self.measure('users.list', client, 'GET', f'/api/users/?limit={size}')
+        self.measure('users.retrieve', client, 'GET', f'/api/users/{author}/')
+        self.measure('users.me', client, 'GET', '/api/users/me/')
+        self.measure('users.create', anonymous, 'POST', '/api/users/', {
+            'email': f'{PREFIX}_new@example.com',
+            'username': f'{PREFIX}_new',
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+            'password': PASSWORD,
+        })
+        self.measure(
+            'users.subscriptions', client, 'GET',
+            f'/api/users/subscriptions/?limit={size}&recipes_limit={size}'
+        )
+        self.measure(
+            'users.subscribe', client, 'POST',
+            f'/api/users/{other}/subscribe/?recipes_limit={size}'
+        )
+        self.measure(
+            'users.unsubscribe', client, 'DELETE',
+            f'/api/users/{other}/subscribe/'
+        )
+        self.measure(
+            'users.avatar', client, 'PUT', '/api/users/me/avatar/',
+            {'avatar': IMAGE}
+        )
+        self.measure(
+            'users.delete_avatar', client, 'DELETE', '/api/users/me/avatar/'
+        )
+        self.measure(
+            'users.set_password', client, 'POST', '/api/users/set_password/',
+            {'current_password': PASSWORD, 'new_password': PASSWORD}
+        )
+
+        self.measure('tags.list', anonymous, 'GET', '/api/tags/')
+        self.measure('tags.retrieve', anonymous, 'GET', f'/api/tags/{tag.pk}/')
+        new_tag = self.measure('tags.create', client, 'POST', '/api/tags/', {
+            'name': f'{PREFIX} new', 'slug': f'{PREFIX}_new'
+        }).json()['id']
+        self.measure('tags.update', client, 'PUT', f'/api/tags/{tag.pk}/', {
+            'name': f'{PREFIX} renamed', 'slug': tag.slug
+        })
+        self.measure('tags.destroy', client, 'DELETE', f'/api/tags/{new_tag}/')
+
+        self.measure('ingredients.list', anonymous, 'GET', '/api/ingredients/')
+        self.measure(
+            'ingredients.search', anonymous, 'GET',
+            f'/api/ingredients/?name={PREFIX}'
+        )
+        self.measure(
+            'ingredients.retrieve', anonymous, 'GET',
+            f'/api/ingredients/{ingredient}/'
+        )
+
+        self.measure(
+            'recipes.list.anonymous', anonymous, 'GET',
+            f'{recipes}?limit={size}'
+        )
+        self.measure('recipes.list', client, 'GET', f'{recipes}?limit={size}')
+        self.measure(
+            'recipes.list.filters', client, 'GET',
+            f'{recipes}?limit={size}&is_favorited=1&is_in_shopping_cart=1'
+            f'&author={author}&tags={tag.slug}'
+        )
+        following = self.measure(
+            'recipes.list.cursor', client, 'GET',
+            f'{recipes}?limit={size}&cursor='
+        ).json()['next']
+        self.measure(
+            'recipes.list.cursor.next', client, 'GET',
+            urlsplit(following)._replace(scheme='', netloc='').geturl()
+        )
+        self.measure('recipes.retrieve', client, 'GET', f'{recipes}{recipe}/')
+        created = self.measure(
+            'recipes.create', client, 'POST', recipes,
+            self.recipe_data(fixture, f'{PREFIX} new')
+        ).json()['id']
+        self.measure(
+            'recipes.update', client, 'PUT', f'{recipes}{created}/',
+            self.recipe_data(fixture, f'{PREFIX} replaced')
+        )
+        self.measure(
+            'recipes.partial_update', client, 'PATCH',
+            f'{recipes}{created}/',
+            self.recipe_data(fixture, f'{PREFIX} updated')
+        )
+        self.measure(
+            'recipes.destroy', client, 'DELETE', f'{recipes}{created}/'
+        )
+        self.measure(
+            'recipes.bulk', client, 'POST', f'{recipes}bulk/',
+            [
+                self.recipe_data(fixture, f'{PREFIX} bulk {number}')
+                for number in range(size)
+            ]
+        )
+        for action in ('favorite', 'shopping_cart'):
+            self.measure(
+                f'recipes.{action}', client, 'POST',
+                f'{recipes}{spare}/{action}/'
+            )
+            self.measure(
+                f'recipes.{action}.delete', client, 'DELETE',
+                f'{recipes}{spare}/{action}/'
+            )
+        self.measure(
+            'recipes.download_shopping_cart', client, 'GET',
+            f'{recipes}download_shopping_cart/'
+        )
+        self.measure(
+            'recipes.shopping_list', client, 'GET', f'{recipes}shopping_list/'
+        )
+        self.measure(
+            'recipes.feed', client, 'GET', f'{recipes}feed/?limit={size}'
+        )
+        self.measure(
+            'recipes.export', anonymous, 'GET',
+            f'{recipes}export/?author={author}'
+        )
+        self.measure(
+            'recipes.get_link', client, 'GET', f'{recipes}{recipe}/get-link/'
+        )
+        self.measure(
+            'recipes.get_links', client, 'GET',
+            f'{recipes}get-links/?ids='
+            + ','.join(map(str, fixture['recipe_ids'][:size]))
+        )
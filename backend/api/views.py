@@ -1,35 +1,46 @@
-import hashids
-from django.db.models import Sum
-from django.http import HttpResponse, HttpResponseNotFound
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.http import (FileResponse, HttpResponse, HttpResponseNotFound,
+                         StreamingHttpResponse)
 from django.shortcuts import redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.status import (HTTP_200_OK, HTTP_201_CREATED,
                                    HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST)
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
-                            ShoppingCart, Tag)
-from users.models import User
-from .pagination import PagePagination
+from api.exporters import EXPORTERS, export_pdf, shopping_list_rows
+from api.mixins import ConditionalGetMixin, ServerTimingMixin
+from api.renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from api.search import ingredient_index
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart, Tag,
+                            resolve_short_code)
+from users.models import Subscription, User
+from .pagination import (FeedCursorPagination, LimitPagination,
+                         PagePagination, RecipeCursorPagination)
 from .permissions import IsAuthorOrReadOnly
 from .filters import IngredientFilter, RecipeFilter
 from .serializer import (CreateRecipeSerializer, CreateSubscriptionSerializer,
                          FavoriteSerializer, RecipeSerializer,
-                         ShoppingCartSerializer, ShortIngredientsSerializer,
+                         ShoppingCartSerializer, ShoppingListItemSerializer,
+                         ShortIngredientsSerializer, ShortRecipeSertializer,
                          SubscriptionSerializer, TagSerializer,
                          UserAvatarSerializer, UserProfileSerializer)
 
 
-class UserProfileViewSet(UserViewSet):
+class UserProfileViewSet(ServerTimingMixin, UserViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitPagination
     queryset = User.objects.all()
 
     @action(
@@ -61,7 +72,7 @@ class UserProfileViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
     @action(
-        methods=['delete', 'put'],
+        methods=['put'],
         permission_classes=[IsAuthenticated],
         detail=True,
         url_path='avatar'
@@ -74,10 +85,10 @@ class UserProfileViewSet(UserViewSet):
         serializer.save()
         return Response(serializer.data, status=HTTP_200_OK)
 
+    @create_avatar.mapping.delete
     def delete_avatar(self, request, id):
         user = request.user
         if user.avatar:
-            user.avatar.delete()
             user.avatar = None
             user.save()
         return Response(status=HTTP_204_NO_CONTENT)
@@ -123,7 +134,7 @@ class UserProfileViewSet(UserViewSet):
         return Response(serializer.data, status=HTTP_201_CREATED)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ServerTimingMixin, ConditionalGetMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
@@ -133,10 +144,49 @@ class RecipeViewSet(ModelViewSet):
     def get_serializer_class(self):
         serializer_classes = {
             'create': CreateRecipeSerializer,
+            'update': CreateRecipeSerializer,
             'partial_update': CreateRecipeSerializer,
         }
         return serializer_classes.get(self.action, RecipeSerializer)
 
+    def get_stamp_sources(self, request):
+        recipes = Recipe.objects.all()
+        if self.action != 'list':
+            try:
+                recipes = recipes.filter(pk=self.kwargs[self.lookup_field])
+            except (ValueError, TypeError):
+                return None
+        if not request.user.is_authenticated:
+            return [recipes]
+        return [
+            recipes,
+            Favorite.objects.filter(user=request.user),
+            ShoppingCart.objects.filter(user=request.user),
+            Subscription.objects.filter(subscriber=request.user),
+        ]
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if (
+                self.request is not None
+                and RecipeCursorPagination.cursor_query_param
+                in self.request.query_params
+            ):
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve', 'export', 'feed'):
+            queryset = queryset.with_user_flags(
+                self.request.user
+            ).with_related()
+        return queryset
+
+    @transaction.atomic
     def handle_user_recipe_relation(
             self, request, pk, serialier_class,
             related_name, exeption, error_massege
@@ -190,27 +240,112 @@ class RecipeViewSet(ModelViewSet):
         methods=['get'],
         detail=False,
         permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            PlainTextRenderer, CSVRenderer, JSONRenderer, PDFRenderer
+        ],
         url_path='download_shopping_cart'
     )
     def download_shopping_cart(self, request):
-        ingr = (
-            IngredientsInRecipe.objects.filter(
-                recipe__shopping_cart__user=request.user
-            ).values(
-                'ingredient__name', 'ingredient__measurement_unit'
-            ).annotate(sum=Sum('amount'))
-        )
-        shopping_list = "\n".join(
-            f"{ingredient['ingredient__name']} = {ingredient['sum']} "
-            f"{ingredient['ingredient__measurement_unit']}"
-            for ingredient in ingr
-        )
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        renderer = request.accepted_renderer
+        rows = shopping_list_rows(request.user)
+        if renderer.format == 'pdf':
+            response = FileResponse(
+                export_pdf(rows), content_type=renderer.media_type
+            )
+        else:
+            response = StreamingHttpResponse(
+                EXPORTERS[renderer.format](rows),
+                content_type=f'{renderer.media_type}; charset=utf-8'
+            )
         response['Content-Disposition'] = (
-            'attachment; filename="Список покупок.txt"'
+            f'attachment; filename="Список покупок.{renderer.format}"'
         )
         return response
 
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='feed'
+    )
+    def feed(self, request):
+        paginator = FeedCursorPagination()
+        page = paginator.paginate_queryset(
+            self.get_queryset(), request, view=self
+        )
+        serializer = RecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_list'
+    )
+    def shopping_list(self, request):
+        serializer = ShoppingListItemSerializer(
+            request.user.shopping_list.select_related('ingredient'),
+            many=True
+        )
+        return Response(serializer.data)
+
+    @action(
+        methods=['post'],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='bulk'
+    )
+    def bulk(self, request):
+        serializer = CreateRecipeSerializer(
+            data=request.data, many=True,
+            context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save()
+        return Response(
+            ShortRecipeSertializer(
+                recipes, many=True, context=self.get_serializer_context()
+            ).data,
+            status=HTTP_201_CREATED
+        )
+
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=[IsAuthenticatedOrReadOnly],
+        url_path='export'
+    )
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            self.stream_recipes(queryset),
+            content_type='application/json'
+        )
+
+    def stream_recipes(self, queryset):
+        chunk_size = settings.RECIPES_EXPORT_CHUNK_SIZE
+        pks = queryset.values_list('pk', flat=True).iterator(
+            chunk_size=chunk_size
+        )
+        separator = ''
+        yield '['
+        while True:
+            chunk = list(islice(pks, chunk_size))
+            if not chunk:
+                break
+            recipes = queryset.in_bulk(chunk)
+            for recipe in RecipeSerializer(
+                [recipes[pk] for pk in chunk], many=True,
+                context=self.get_serializer_context()
+            ).data:
+                yield separator + json.dumps(
+                    recipe, cls=JSONEncoder, ensure_ascii=False
+                )
+                separator = ','
+        yield ']'
+
     @action(
         methods=['get'],
         detail=True,
@@ -219,22 +354,60 @@ class RecipeViewSet(ModelViewSet):
     )
     def get_link(self, request, pk):
         recipe = self.get_object()
-        hashid = hashids.Hashids(salt='random_salt', min_length=6)
-        hashid_id = hashid.encode(recipe.id)
-        short_link = f'{request.get_host()}/s/{hashid_id}'
-        return Response({'short-link': short_link})
+        if recipe.short_code is None:
+            Recipe.objects.assign_short_codes([recipe])
+        return Response(
+            {'short-link': self.get_short_link(request, recipe)}
+        )
+
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=[IsAuthenticatedOrReadOnly],
+        url_path='get-links'
+    )
+    def get_links(self, request):
+        ids = request.query_params.get('ids', '').split(',')
+        try:
+            ids = {int(pk) for pk in ids if pk}
+        except ValueError:
+            return Response(
+                'Передайте id рецептов через запятую',
+                status=HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > settings.MAX_PAGE_SIZE:
+            return Response(
+                f'Не больше {settings.MAX_PAGE_SIZE} рецептов за запрос',
+                status=HTTP_400_BAD_REQUEST,
+            )
+        recipes = list(
+            Recipe.objects.filter(pk__in=ids).only('short_code').order_by('pk')
+        )
+        Recipe.objects.assign_short_codes(
+            [recipe for recipe in recipes if recipe.short_code is None]
+        )
+        return Response([
+            {'id': recipe.pk, 'short-link': self.get_short_link(
+                request, recipe
+            )}
+            for recipe in recipes
+        ])
+
+    def get_short_link(self, request, recipe):
+        return f'{request.get_host()}/s/{recipe.short_code}'
 
 
 def redirect_to_recipe(request, short_id):
-    hashid = hashids.Hashids(salt='random_salt', min_length=6)
-    decoded_id = hashid.decode(short_id)
-    if decoded_id:
-        recipe_id = decoded_id[0]
-        return redirect(f'/recipes/{recipe_id}/')
-    return HttpResponseNotFound('Рецепт не был найден')
+    try:
+        recipe_id = resolve_short_code(short_id)
+    except Recipe.DoesNotExist:
+        return HttpResponseNotFound('Рецепт не был найден')
+    return redirect(f'/recipes/{recipe_id}/')
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ServerTimingMixin, ConditionalGetMixin, ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     permission_classes = [AllowAny]
     serializer_class = ShortIngredientsSerializer
@@ -242,9 +415,31 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     search_fields = ('^name',)
 
+    def get_stamp_sources(self, request):
+        return [Ingredient.objects.all()]
 
-class TagViewSet(ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        if (
+            request.accepted_renderer.format != 'json'
+            or 'search' in request.query_params
+        ):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(self.list_from_index, request)
+
+    def list_from_index(self, request):
+        return HttpResponse(
+            ingredient_index.search(
+                self.stamps[0], request.query_params.get('name', '')
+            ),
+            content_type='application/json'
+        )
+
+
+class TagViewSet(ServerTimingMixin, ConditionalGetMixin, ModelViewSet):
     queryset = Tag.objects.all()
     permission_classes = [AllowAny]
     serializer_class = TagSerializer
     pagination_class = None
+
+    def get_stamp_sources(self, request):
+        return [Tag.objects.all()]
@@ -3,7 +3,7 @@ from django.contrib.admin import ModelAdmin, register
 from users.models import Subscription
 
 from .models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingListItem, Tag)
 
 
 @register(Favorite)
@@ -42,15 +42,17 @@ class TagAdmin(ModelAdmin):
 @register(Recipe)
 class RecipeAdmin(ModelAdmin):
     list_display = (
-        'pk', 'author', 'name', 'created', 'get_favorites', 'get_tags'
+        'pk', 'author', 'name', 'created', 'favorites_count',
+        'in_carts_count', 'get_tags'
     )
     list_filter = ('author', 'name', 'tags')
     search_fields = ('author__username', 'name')
     inlines = [IngredientInRecipeAdmin]
 
-    @admin.display(description='Кол-во рецептов в избранном')
-    def get_favorites(self, object):
-        return object.favorites.count()
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            ShoppingListItem.objects.rebuild_for_recipe(form.instance.pk)
 
     @admin.display(description='Теги')
     def get_tags(self, object):
@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+import re
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+JSON_SEPARATOR = re.compile(r'[\s,]*')
+
+
+def read_json_array(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    finished = False
+    while True:
+        position = JSON_SEPARATOR.match(buffer, position).end()
+        if position < len(buffer):
+            if not opened:
+                if buffer[position] != '[':
+                    raise ValueError('ожидается массив JSON')
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if finished:
+                    raise
+            else:
+                if end < len(buffer) or finished:
+                    yield item
+                    position = end
+                    continue
+        elif finished:
+            raise ValueError('неожиданный конец JSON')
+        chunk = file.read(JSON_CHUNK_SIZE)
+        finished = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+class CatalogLoadCommand(BaseCommand):
+    model = None
+    file_name = None
+    fields = ()
+    key_fields = ()
+    message = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(
+                settings.CSV_FILES_DIR, f'{self.file_name}.csv'
+            )
+        )
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_CREATE_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.read = self.skipped = self.created = self.updated = 0
+        rows = self.read_catalog(options['path'])
+        with transaction.atomic():
+            for batch in iter(
+                lambda: list(islice(rows, options['batch_size'])), []
+            ):
+                self.upsert(batch, options['batch_size'])
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        print(
+            f'Прочитано строк: {self.read}, пропущено: {self.skipped}, '
+            f'добавлено: {self.created}, обновлено: {self.updated} '
+            f'за {time.perf_counter() - started:.2f} с.'
+        )
+        if options['dry_run']:
+            print('Пробный запуск, изменения не сохранены.')
+        else:
+            print(self.message)
+
+    def get_key(self, row):
+        return tuple(row[name] for name in self.key_fields)
+
+    def upsert(self, batch, batch_size):
+        rows = {self.get_key(row): row for row in batch}
+        lookup = self.key_fields[0]
+        existing = {
+            self.get_key(values): values
+            for values in self.model.objects.filter(**{
+                f'{lookup}__in': {row[lookup] for row in rows.values()}
+            }).values('pk', *self.fields)
+        }
+        update_fields = [
+            name for name in self.fields if name not in self.key_fields
+        ]
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for key, row in rows.items():
+            current = existing.get(key)
+            if current is None:
+                to_create.append(self.model(**row))
+            elif any(current[name] != row[name] for name in update_fields):
+                to_update.append(
+                    self.model(pk=current['pk'], updated=now, **row)
+                )
+        self.model.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            self.model.objects.bulk_update(
+                to_update, [*update_fields, 'updated'], batch_size=batch_size
+            )
+            self.touch_recipes([item.pk for item in to_update])
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    def read_catalog(self, path):
+        try:
+            for values in self.read_rows(path):
+                self.read += 1
+                if len(values) != len(self.fields) or not all(values):
+                    self.skipped += 1
+                    continue
+                yield dict(zip(self.fields, values))
+        except (OSError, ValueError, csv.Error) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+    def read_rows(self, path):
+        with open(path, newline='', encoding='utf-8') as file:
+            if path.endswith(JSON_LINES_EXTENSIONS):
+                items = (json.loads(line) for line in file if line.strip())
+            elif path.endswith('.json'):
+                items = read_json_array(file)
+            else:
+                for row in csv.reader(file):
+                    yield [value.strip() for value in row]
+                return
+            for item in items:
+                yield [
+                    str(item.get(name) or '').strip()
+                    for name in self.fields
+                ]
+
+    def touch_recipes(self, pks):
+        pass
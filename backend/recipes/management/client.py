@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+TEST_HOST = 'testserver'
+
+
+@contextmanager
+def in_process():
+    with override_settings(ALLOWED_HOSTS=[TEST_HOST]):
+        yield
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def perform(client, method, path, data=None):
+    if method == 'GET':
+        response = client.get(path, data)
+    else:
+        response = getattr(client, method.lower())(path, data, format='json')
+    response.getvalue()
+    return response
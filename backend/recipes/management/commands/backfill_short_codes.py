@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        batch_size = settings.BULK_CREATE_BATCH_SIZE
+        recipes = Recipe.objects.filter(
+            short_code__isnull=True
+        ).only('pk').order_by('pk')
+        filled = 0
+        while True:
+            batch = list(recipes[:batch_size])
+            if not batch:
+                break
+            Recipe.objects.assign_short_codes(batch)
+            filled += len(batch)
+        print(f'Заполнено коротких ссылок: {filled}.')
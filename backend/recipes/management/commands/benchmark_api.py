@@ -0,0 +1,276 @@
+import json
+import math
+import os
+import re
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from recipes.management.client import get_client, in_process, perform
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import Subscription, User
+
+VARIABLE_PATTERN = re.compile(r'{{(\w+)}}')
+PERCENTILES = (50, 95, 99)
+FLOWS = {
+    'users': ('users/get_user_info',),
+    'tags': ('tags/get_tags_info',),
+    'ingredients': ('ingredients/get_ingradients',),
+    'recipes': (
+        'recipes/get_recipes',
+        'recipes/get_recipe_short_link',
+        'recipe_filters_for_favorite_and_shopping_cart',
+    ),
+    'favorite': ('favorite/add_to_favorite', 'delete_requests/favorite'),
+    'shopping_cart': (
+        'shopping_cart/add_to_shopping_cart',
+        'shopping_cart/download_shopping_cart',
+        'delete_requests/shopping_cart',
+    ),
+    'subscriptions': (
+        'subscriptions/create_subscriptions',
+        'subscriptions/get_subscriptions',
+        'delete_requests/subscriptions',
+    ),
+}
+
+
+def read_requests(items, folder=(), auth=None):
+    for item in items:
+        if 'item' in item:
+            yield from read_requests(
+                item['item'], (*folder, item['name']), item.get('auth', auth)
+            )
+            continue
+        request = item['request']
+        yield '/'.join(folder), request, request.get('auth', auth)
+
+
+def percentile(values, rank):
+    return values[max(math.ceil(len(values) * rank / 100) - 1, 0)]
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collection',
+            default=os.path.join(
+                settings.BASE_DIR.parent, 'postman_collection',
+                'foodgram.postman_collection.json'
+            )
+        )
+        parser.add_argument(
+            '--flows', nargs='+', choices=FLOWS, default=list(FLOWS)
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--user')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--baseline')
+        parser.add_argument('--threshold', type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        clients = {False: get_client(), True: get_client(user)}
+        flows = self.read_flows(
+            options['collection'], options['flows'], self.get_variables(user)
+        )
+        timings = {}
+        queries = {}
+        errors = {}
+        started = time.perf_counter()
+        with in_process():
+            for iteration in range(options['warmup'] + options['iterations']):
+                for key, authorized, method, path in flows:
+                    with CaptureQueriesContext(connection) as captured:
+                        request_started = time.perf_counter()
+                        response = perform(
+                            clients[authorized], method, path
+                        )
+                        elapsed = time.perf_counter() - request_started
+                    if iteration < options['warmup']:
+                        continue
+                    timings.setdefault(key, []).append(elapsed)
+                    queries[key] = max(
+                        queries.get(key, 0), len(captured.captured_queries)
+                    )
+                    errors[key] = (
+                        errors.get(key, 0) + (response.status_code >= 400)
+                    )
+            total = time.perf_counter() - started
+            memory = self.measure_memory(flows, clients)
+
+        results = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'user': user.username,
+            'iterations': options['iterations'],
+            'throughput': round(
+                len(flows) * (options['warmup'] + options['iterations'])
+                / total, 1
+            ),
+            'endpoints': {
+                key: self.summarize(
+                    timings[key], queries[key], memory[key], errors[key]
+                )
+                for key in timings
+            },
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        self.report(results)
+        print(f'Результаты сохранены в {options["output"]}.')
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['threshold'])
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Пользователь {username} не найден.')
+            return user
+        busiest = Subscription.objects.values('subscriber').annotate(
+            total=Count('pk')
+        ).order_by('-total').first()
+        if busiest is None:
+            raise CommandError(
+                'Нет данных для замеров, сначала выполните seed_scale.'
+            )
+        return User.objects.get(pk=busiest['subscriber'])
+
+    def get_variables(self, user):
+        variables = {'baseUrl': '', 'userId': user.pk}
+        authors = User.objects.exclude(pk=user.pk).exclude(
+            subscription_author__subscriber=user
+        ).order_by('-recipes_count')[:2]
+        for name, author in zip(('secondUserId', 'thirdUserId'), authors):
+            variables[name] = author.pk
+        recipe = Recipe.objects.exclude(favorites__user=user).exclude(
+            shopping_cart__user=user
+        ).order_by('-created').first()
+        if recipe is not None:
+            variables['firstRecipeId'] = recipe.pk
+        tags = list(Tag.objects.order_by('pk')[:3])
+        for name, tag in zip(
+            ('firstTagId', 'secondTagSlug', 'thirdTagSlug'), tags
+        ):
+            variables[name] = tag.slug if name.endswith('Slug') else tag.pk
+        ingredient = Ingredient.objects.order_by('pk').first()
+        if ingredient is not None:
+            variables['firstIndredientId'] = ingredient.pk
+            variables['ingredientNameFirstLatter'] = ingredient.name[0]
+        return variables
+
+    def read_flows(self, path, names, variables):
+        try:
+            with open(path, encoding='utf-8') as file:
+                collection = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать коллекцию: {error}')
+        requests = list(read_requests(
+            collection['item'], auth=collection.get('auth')
+        ))
+        flows = []
+        for name in names:
+            for folder in FLOWS[name]:
+                for request_folder, request, auth in requests:
+                    if request_folder != folder:
+                        continue
+                    url = request['url']['raw']
+                    missing = set(VARIABLE_PATTERN.findall(url)) - set(
+                        variables
+                    )
+                    if missing:
+                        print(f'Пропущен {request["method"]} {url}: '
+                              f'нет значений {", ".join(sorted(missing))}.')
+                        continue
+                    authorized = (auth or {}).get('type', 'noauth') != 'noauth'
+                    flows.append((
+                        f'{request["method"]} '
+                        f'{url.replace("{{baseUrl}}", "")}'
+                        f'{"" if authorized else " [anonymous]"}',
+                        authorized,
+                        request['method'],
+                        VARIABLE_PATTERN.sub(
+                            lambda match: str(variables[match[1]]), url
+                        ),
+                    ))
+        if not flows:
+            raise CommandError('В коллекции не найдено запросов для замеров.')
+        return flows
+
+    def measure_memory(self, flows, clients):
+        memory = {}
+        tracemalloc.start()
+        try:
+            for key, authorized, method, path in flows:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                perform(clients[authorized], method, path)
+                memory[key] = max(
+                    memory.get(key, 0),
+                    tracemalloc.get_traced_memory()[1] - before
+                )
+        finally:
+            tracemalloc.stop()
+        return memory
+
+    def summarize(self, timings, queries, memory, errors):
+        timings = sorted(timings)
+        summary = {
+            f'p{rank}_ms': round(percentile(timings, rank) * 1000, 2)
+            for rank in PERCENTILES
+        }
+        summary.update(
+            throughput=round(len(timings) / sum(timings), 1),
+            queries=queries,
+            peak_memory_kb=round(memory / 1024, 1),
+            errors=errors,
+        )
+        return summary
+
+    def report(self, results):
+        for key, summary in results['endpoints'].items():
+            print(
+                f'{key}: p50 {summary["p50_ms"]} мс, '
+                f'p95 {summary["p95_ms"]} мс, p99 {summary["p99_ms"]} мс, '
+                f'{summary["throughput"]} запр./с, '
+                f'запросов к БД {summary["queries"]}, '
+                f'память {summary["peak_memory_kb"]} КБ'
+                + (f', ошибок {summary["errors"]}' if summary['errors']
+                   else '')
+            )
+        print(f'Общая пропускная способность: '
+              f'{results["throughput"]} запр./с.')
+
+    def compare(self, results, path, threshold):
+        try:
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)['endpoints']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать базовый замер: {error}')
+        regressions = []
+        for key, summary in results['endpoints'].items():
+            if key not in baseline:
+                continue
+            before = baseline[key]
+            change = summary['p95_ms'] / before['p95_ms'] - 1
+            print(
+                f'{key}: p95 {before["p95_ms"]} → {summary["p95_ms"]} мс '
+                f'({change:+.0%}), запросов к БД '
+                f'{before["queries"]} → {summary["queries"]}'
+            )
+            if change > threshold or summary['queries'] > before['queries']:
+                regressions.append(key)
+        if regressions:
+            raise CommandError(
+                'Обнаружены регрессии: ' + '; '.join(regressions)
+            )
+        print('Регрессий относительно базового замера нет.')
@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api.images import VARIANTS_DIR, get_variant_names
+from api.storage import BLOB_REFERENCES
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_GC_MIN_AGE
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        directories = {VARIANTS_DIR}
+        for model, field in BLOB_REFERENCES:
+            directories.add(model._meta.get_field(field).upload_to.strip('/'))
+            names = model.objects.exclude(
+                **{field: ''}
+            ).values_list(field, flat=True)
+            for name in names.iterator():
+                referenced.add(name)
+                referenced.update(get_variant_names(name))
+        deadline = time.time() - options['min_age']
+        removed = 0
+        freed = 0
+        for name in self.walk(directories):
+            path = default_storage.path(name)
+            if name in referenced or os.path.getmtime(path) > deadline:
+                continue
+            removed += 1
+            freed += os.path.getsize(path)
+            if not options['dry_run']:
+                default_storage.delete(name)
+        print(f'Удалено файлов без ссылок: {removed} ({freed} байт).')
+
+    def walk(self, directories):
+        for directory in directories:
+            root = default_storage.path(directory)
+            for path, _, files in os.walk(root):
+                for filename in files:
+                    if filename.startswith('.'):
+                        continue
+                    yield os.path.relpath(
+                        os.path.join(path, filename), settings.MEDIA_ROOT
+                    ).replace(os.sep, '/')
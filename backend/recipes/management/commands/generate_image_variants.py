@@ -0,0 +1,42 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from api.cache import touch_author, touch_recipe
+from api.images import get_render_job, save_variants, variants_ready
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true')
+
+    def handle(self, *args, **options):
+        sources = (
+            (Recipe, 'image', 'image_variants', touch_recipe),
+            (User, 'avatar', 'avatar_variants', touch_author),
+        )
+        generated = 0
+        for model, field, variants_field, touch in sources:
+            objects = model.objects.exclude(
+                **{field: ''}
+            ).only('pk', field, variants_field)
+            for obj in objects.iterator():
+                file = getattr(obj, field)
+                if not options['force'] and variants_ready(
+                    file, getattr(obj, variants_field)
+                ):
+                    continue
+                try:
+                    variants = get_render_job(file)()
+                except OSError as error:
+                    print(f'{file.name}: {error}')
+                    continue
+                save_variants(
+                    model, obj.pk, field, variants_field, variants,
+                    partial(touch, obj.pk)
+                )
+                generated += 1
+        print(f'Подготовлено вариантов изображений: {generated}.')
@@ -1,21 +1,10 @@
-import csv
-
-from django.core.management.base import BaseCommand
+from recipes.management.base import CatalogLoadCommand
 from recipes.models import Ingredient
 
 
-class Command(BaseCommand):
-
-    def handle(self, *args, **options):
-        self.import_ingredients()
-        print('Загрузка ингредиентов для базы данных завершена.')
-
-    def import_ingredients(self, file='ingredients.csv'):
-        path = f'./data/{file}'
-        with open(path, newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                status, created = Ingredient.objects.update_or_create(
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
+class Command(CatalogLoadCommand):
+    model = Ingredient
+    file_name = 'ingredients'
+    fields = ('name', 'measurement_unit')
+    key_fields = ('name', 'measurement_unit')
+    message = 'Загрузка ингредиентов для базы данных завершена.'
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import FeedEntry
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.rebuild()
+        print('Ленты подписок заполнены.')
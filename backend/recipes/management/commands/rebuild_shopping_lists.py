@@ -0,0 +1,25 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.models import ShoppingCart, ShoppingListItem
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_CREATE_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        user_ids = ShoppingCart.objects.values_list(
+            'user_id', flat=True
+        ).distinct().order_by('user_id').iterator()
+        rebuilt = 0
+        for batch in iter(
+            lambda: list(islice(user_ids, options['batch_size'])), []
+        ):
+            ShoppingListItem.objects.rebuild(batch)
+            rebuilt += len(batch)
+        print(f'Списки покупок пересобраны: {rebuilt}.')
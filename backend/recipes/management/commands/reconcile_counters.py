@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.core.management.base import BaseCommand
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+)
+
+
+def count_related(model, key):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{key: OuterRef('pk')}
+            ).order_by().values(key).annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, field, related_model, key in COUNTERS:
+                fixed = model.objects.filter(
+                    ~Q(**{field: count_related(related_model, key)})
+                ).update(**{field: count_related(related_model, key)})
+                print(f'{model._meta.verbose_name_plural}, {field}: '
+                      f'исправлено {fixed}.')
@@ -0,0 +1,236 @@
+import random
+import time
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.models import Subscription, User
+
+MAX_ATTEMPTS_FACTOR = 10
+
+
+class ZipfSampler:
+
+    def __init__(self, items, exponent, rng):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(items) + 1)
+        ))
+
+    def sample(self):
+        return self.items[bisect(
+            self.cum_weights, self.rng.random() * self.cum_weights[-1]
+        )]
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument('--zipf', type=float, default=1.1)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_CREATE_BATCH_SIZE
+        )
+        parser.add_argument('--skip-feeds', action='store_true')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.started = time.perf_counter()
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError(
+                'Сначала загрузите ингредиенты и теги: '
+                'load_ingredients, load_tags.'
+            )
+        if User.objects.filter(
+            username__startswith=f'{options["prefix"]}_'
+        ).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {options["prefix"]} уже есть, '
+                'укажите другой --prefix.'
+            )
+        self.rng.shuffle(ingredient_ids)
+
+        user_ids = self.create_users(options['users'], options['prefix'])
+        authors = ZipfSampler(user_ids, options['zipf'], self.rng)
+        recipe_ids = self.create_recipes(options['recipes'], authors)
+        self.spread_created(recipe_ids, options['days'])
+        popular_recipes = ZipfSampler(
+            self.rng.sample(recipe_ids, len(recipe_ids)),
+            options['zipf'], self.rng
+        )
+        self.create_ingredients(
+            recipe_ids,
+            ZipfSampler(ingredient_ids, options['zipf'], self.rng),
+            options['ingredients_per_recipe']
+        )
+        self.create_tags(recipe_ids, tag_ids)
+        self.create_pairs(
+            'избранное', Favorite, 'user_id', 'recipe_id',
+            options['favorites'],
+            lambda: self.rng.choice(user_ids), popular_recipes.sample
+        )
+        self.create_pairs(
+            'корзины', ShoppingCart, 'user_id', 'recipe_id',
+            options['carts'],
+            lambda: self.rng.choice(user_ids), popular_recipes.sample
+        )
+        self.create_pairs(
+            'подписки', Subscription, 'subscriber_id', 'author_id',
+            options['subscriptions'],
+            lambda: self.rng.choice(user_ids), authors.sample
+        )
+
+        for start in range(0, len(user_ids), self.batch_size):
+            ShoppingListItem.objects.rebuild(
+                user_ids[start:start + self.batch_size]
+            )
+        self.report('списки покупок')
+        call_command('reconcile_counters')
+        self.report('счётчики')
+        call_command('backfill_short_codes')
+        self.report('короткие ссылки')
+        if not options['skip_feeds']:
+            call_command('rebuild_feeds')
+            self.report('ленты подписок')
+        self.report('готово')
+
+    def report(self, stage, count=None):
+        elapsed = time.perf_counter() - self.started
+        suffix = '' if count is None else f': {count}'
+        print(f'[{elapsed:8.2f} с] {stage}{suffix}')
+
+    def insert(self, model, objects):
+        objects = iter(objects)
+        inserted = 0
+        with transaction.atomic():
+            while True:
+                batch = list(islice(objects, self.batch_size * 10))
+                if not batch:
+                    return inserted
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+                inserted += len(batch)
+
+    def insert_with_ids(self, model, objects):
+        last_pk = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        self.insert(model, objects)
+        return list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def create_users(self, count, prefix):
+        password = make_password(None)
+        user_ids = self.insert_with_ids(User, (
+            User(
+                username=f'{prefix}_{number}',
+                email=f'{prefix}_{number}@example.com',
+                first_name=f'Имя {number}',
+                last_name=f'Фамилия {number}',
+                password=password,
+            )
+            for number in range(count)
+        ))
+        self.report('пользователи', len(user_ids))
+        return user_ids
+
+    def create_recipes(self, count, authors):
+        recipe_ids = self.insert_with_ids(Recipe, (
+            Recipe(
+                author_id=authors.sample(),
+                name=f'Рецепт {number}',
+                text=f'Описание рецепта {number}',
+                cooking_time=self.rng.randint(5, 180),
+            )
+            for number in range(count)
+        ))
+        self.report('рецепты', len(recipe_ids))
+        return recipe_ids
+
+    def spread_created(self, recipe_ids, days):
+        now = timezone.now()
+        span = timedelta(days=days).total_seconds()
+        offsets = sorted(
+            (self.rng.random() * span for _ in recipe_ids), reverse=True
+        )
+        with transaction.atomic():
+            for start in range(0, len(recipe_ids), self.batch_size):
+                Recipe.objects.bulk_update([
+                    Recipe(pk=pk, created=now - timedelta(seconds=offset))
+                    for pk, offset in zip(
+                        recipe_ids[start:start + self.batch_size],
+                        offsets[start:start + self.batch_size]
+                    )
+                ], ['created'])
+        self.report('даты создания рецептов', len(recipe_ids))
+
+    def create_ingredients(self, recipe_ids, ingredients, per_recipe):
+        def rows():
+            for recipe_id in recipe_ids:
+                chosen = set()
+                size = self.rng.randint(1, max(2 * per_recipe - 1, 1))
+                for _ in range(size * MAX_ATTEMPTS_FACTOR):
+                    if len(chosen) == size:
+                        break
+                    chosen.add(ingredients.sample())
+                for ingredient_id in chosen:
+                    yield IngredientsInRecipe(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=self.rng.randint(1, 1000)
+                    )
+
+        self.report(
+            'ингредиенты в рецептах',
+            self.insert(IngredientsInRecipe, rows())
+        )
+
+    def create_tags(self, recipe_ids, tag_ids):
+        self.report('теги рецептов', self.insert(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, len(tag_ids))
+            )
+        )))
+
+    def create_pairs(
+        self, stage, model, left, right, count, pick_left, pick_right
+    ):
+        def rows():
+            seen = set()
+            for _ in range(count * MAX_ATTEMPTS_FACTOR):
+                if len(seen) == count:
+                    return
+                pair = (pick_left(), pick_right())
+                if pair[0] == pair[1] and model is Subscription:
+                    continue
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                yield model(**{left: pair[0], right: pair[1]})
+
+        self.report(stage, self.insert(model, rows()))
@@ -0,0 +1,145 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:47
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Favorite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'Избранное',
+                'verbose_name_plural': 'Избранное',
+                'ordering': ('-user',),
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Время и дата создания рецепта')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+                'ordering': ('-created', '-recipe_id'),
+            },
+        ),
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('measurement_unit', models.CharField(max_length=100, verbose_name='Единица измерения')),
+                ('name', models.CharField(max_length=100, verbose_name='Название ингредиента')),
+                ('amount', models.PositiveSmallIntegerField(null=True, verbose_name='Количество ингредиентов в рецепте')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент',
+                'verbose_name_plural': 'Ингредиенты',
+                'ordering': ('-name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientsInRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(32000)], verbose_name='Количество ингредиентов в рецепте')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в рецепте',
+                'verbose_name_plural': 'Ингредиенты в рецепте',
+                'ordering': ('recipe__name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Recipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('short_code', models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True, verbose_name='Короткий код ссылки')),
+                ('name', models.CharField(max_length=100, verbose_name='Название рецепта')),
+                ('text', models.CharField(max_length=500, verbose_name='Описание рецепта')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Время и дата создания рецепта')),
+                ('cooking_time', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(32000)], verbose_name='Время приготовления')),
+                ('image', models.ImageField(blank=True, db_index=True, upload_to='recipes/', verbose_name='Фото рецепта')),
+                ('image_variants', models.JSONField(blank=True, default=dict, editable=False, verbose_name='Варианты фото рецепта')),
+                ('favorites_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во в избранном')),
+                ('in_carts_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во в корзинах')),
+            ],
+            options={
+                'verbose_name': 'Рецепт',
+                'verbose_name_plural': 'Рецепты',
+                'ordering': ('-created',),
+                'default_related_name': 'recipe',
+            },
+        ),
+        migrations.CreateModel(
+            name='ShoppingCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'Корзина покупок',
+                'ordering': ('-user',),
+                'abstract': False,
+                'default_related_name': 'shopping_cart',
+            },
+        ),
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Список покупок',
+                'ordering': ('ingredient__name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=40, unique=True, verbose_name='Название тега')),
+                ('slug', models.SlugField(max_length=100, unique=True, verbose_name='Слаг тега')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='TagInRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Рецепт')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.tag', verbose_name='Теги')),
+            ],
+            options={
+                'verbose_name': 'Тег рецепта',
+                'verbose_name_plural': 'Теги рецепта',
+                'ordering': ('recipe__name',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('name', 'slug'), name='unique_tags'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент'),
+        ),
+    ]
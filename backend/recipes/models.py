@@ -1,6 +1,14 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (Exists, F, OuterRef, Prefetch, Q, Sum,
+                              Window)
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from hashids import Hashids
+
+from users.models import Subscription, exclude_counters
 
 User = get_user_model()
 
@@ -12,6 +20,13 @@ TAG_NAME_MAX_LENGTH = 40
 TAG_SLUG_MAX_LENGTH = 100
 RECIPE_NAME_MAX_LENGTH = 100
 RECIPE_TEXT_MAX_LENGTH = 500
+SHORT_CODE_MIN_LENGTH = 6
+SHORT_CODE_MAX_LENGTH = 32
+RECIPE_COUNTER_FIELDS = ('favorites_count', 'in_carts_count')
+
+short_code_encoder = Hashids(
+    salt=settings.SHORT_LINK_SALT, min_length=SHORT_CODE_MIN_LENGTH
+)
 
 
 class Ingredient(models.Model):
@@ -27,6 +42,10 @@ class Ingredient(models.Model):
         verbose_name='Количество ингредиентов в рецепте',
         null=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Время и дата изменения ингредиента',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -89,6 +108,10 @@ class Tag(models.Model):
         max_length=TAG_SLUG_MAX_LENGTH,
         unique=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Время и дата изменения тега',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -132,7 +155,81 @@ class TagInRecipe(models.Model):
         return f'{self.tag} {self.recipe}'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )
+            ),
+        )
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_with_ingredients',
+                queryset=IngredientsInRecipe.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
+
+    def ranked_by_author(self):
+        return self.annotate(
+            author_rank=Window(
+                RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('created').desc(), F('id').desc()],
+            )
+        ).order_by()
+
+    def latest_by_author(self, author_ids, limit=None):
+        sql, params = self.filter(
+            author_id__in=author_ids
+        ).ranked_by_author().query.sql_with_params()
+        sql = f'SELECT * FROM ({sql}) ranked'
+        if limit is not None:
+            sql += ' WHERE author_rank <= %s'
+            params = (*params, limit)
+        return self.model.objects.raw(
+            f'{sql} ORDER BY author_id, author_rank', params
+        )
+
+    def touch(self):
+        return self.update(updated=timezone.now())
+
+    def assign_short_codes(self, recipes, batch_size=None):
+        for recipe in recipes:
+            recipe.short_code = short_code_encoder.encode(recipe.pk)
+        self.model.objects.bulk_update(
+            recipes, ['short_code'], batch_size=batch_size
+        )
+
+
 class Recipe(models.Model):
+    short_code = models.CharField(
+        verbose_name='Короткий код ссылки',
+        max_length=SHORT_CODE_MAX_LENGTH,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
     name = models.CharField(
         verbose_name='Название рецепта',
         max_length=RECIPE_NAME_MAX_LENGTH
@@ -146,6 +243,11 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    updated = models.DateTimeField(
+        verbose_name='Время и дата изменения рецепта',
+        auto_now=True,
+        db_index=True,
+    )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления',
         validators=[
@@ -159,13 +261,30 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Фото рецепта',
         blank=True,
+        db_index=True,
         upload_to='recipes/'
     )
+    image_variants = models.JSONField(
+        verbose_name='Варианты фото рецепта',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         verbose_name='Ингредиенты рецепта',
         through='IngredientsInRecipe'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Кол-во в избранном',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Кол-во в корзинах',
+        default=0,
+        editable=False
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор рецепта',
@@ -173,6 +292,8 @@ class Recipe(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -182,6 +303,24 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(
+            *args, **exclude_counters(self, RECIPE_COUNTER_FIELDS, kwargs)
+        )
+        if self.short_code is None:
+            Recipe.objects.assign_short_codes([self])
+
+
+def resolve_short_code(short_code):
+    recipes = Recipe.objects.values_list('pk', flat=True)
+    try:
+        return recipes.get(short_code=short_code)
+    except Recipe.DoesNotExist:
+        decoded = short_code_encoder.decode(short_code)
+        if len(decoded) != 1:
+            raise
+        return recipes.get(pk=decoded[0])
+
 
 class UserRecipe(models.Model):
     recipe = models.ForeignKey(
@@ -241,3 +380,256 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f"{self.user} {self.recipe}"
+
+
+class ShoppingListQuerySet(models.QuerySet):
+
+    def add_recipe(self, user_id, recipe_id):
+        self.apply_recipe(user_id, recipe_id, 1)
+
+    def remove_recipe(self, user_id, recipe_id):
+        self.apply_recipe(user_id, recipe_id, -1)
+
+    def apply_recipe(self, user_id, recipe_id, sign):
+        amounts = dict(
+            IngredientsInRecipe.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', 'amount')
+        )
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(pk=user_id))
+            items = {
+                item.ingredient_id: item
+                for item in self.filter(
+                    user_id=user_id, ingredient_id__in=amounts
+                )
+            }
+            to_create, to_update, to_delete = [], [], []
+            for ingredient_id, amount in amounts.items():
+                item = items.get(ingredient_id)
+                if item is None:
+                    if sign > 0:
+                        to_create.append(self.model(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=amount
+                        ))
+                    continue
+                item.amount += sign * amount
+                if item.amount > 0:
+                    to_update.append(item)
+                else:
+                    to_delete.append(item.pk)
+            self.bulk_create(to_create)
+            self.bulk_update(to_update, ['amount'])
+            self.filter(pk__in=to_delete).delete()
+
+    def rebuild(self, user_ids):
+        user_ids = list(user_ids)
+        totals = IngredientsInRecipe.objects.filter(
+            recipe__shopping_cart__user_id__in=user_ids
+        ).values(
+            'recipe__shopping_cart__user_id', 'ingredient_id'
+        ).annotate(total=Sum('amount')).order_by()
+        with transaction.atomic():
+            self.filter(user_id__in=user_ids).delete()
+            self.bulk_create(
+                self.model(
+                    user_id=row['recipe__shopping_cart__user_id'],
+                    ingredient_id=row['ingredient_id'],
+                    amount=row['total']
+                )
+                for row in totals
+            )
+
+    def rebuild_for_recipe(self, recipe_id):
+        self.rebuild(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('user_id', flat=True)
+        )
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+        on_delete=models.CASCADE
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_items',
+        on_delete=models.CASCADE
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        ordering = ('ingredient__name',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient}'
+
+
+def older_than(position, pk_field='id'):
+    created, pk = position
+    return Q(created__lt=created) | Q(created=created, **{
+        f'{pk_field}__lt': pk
+    })
+
+
+class FeedEntryQuerySet(models.QuerySet):
+
+    def is_pull_author(self, author_id):
+        return User.objects.filter(
+            pk=author_id,
+            subscribers_count__gt=settings.FEED_FANOUT_MAX_SUBSCRIBERS
+        ).exists()
+
+    def pull_author_ids(self, user):
+        return list(user.subscription_subscriber.filter(
+            author__subscribers_count__gt=settings.FEED_FANOUT_MAX_SUBSCRIBERS
+        ).values_list('author_id', flat=True))
+
+    def fan_out(self, recipes):
+        batch_size = settings.FEED_FANOUT_BATCH_SIZE
+        by_author = {}
+        for recipe in recipes:
+            by_author.setdefault(recipe.author_id, []).append(recipe)
+        for author_id, author_recipes in by_author.items():
+            if self.is_pull_author(author_id):
+                continue
+            subscriber_ids = Subscription.objects.filter(
+                author_id=author_id
+            ).values_list('subscriber_id', flat=True)
+            batch = []
+            for subscriber_id in subscriber_ids.iterator(
+                chunk_size=batch_size
+            ):
+                batch.extend(
+                    self.model(
+                        user_id=subscriber_id,
+                        recipe_id=recipe.pk,
+                        created=recipe.created
+                    )
+                    for recipe in author_recipes
+                )
+                if len(batch) >= batch_size:
+                    self.bulk_create(batch, ignore_conflicts=True)
+                    batch = []
+            self.bulk_create(batch, ignore_conflicts=True)
+
+    def backfill(self, user_id, author_id):
+        if self.is_pull_author(author_id):
+            return
+        recipes = Recipe.objects.filter(
+            author_id=author_id
+        ).order_by('-created', '-id').values_list(
+            'pk', 'created'
+        )[:settings.FEED_BACKFILL_SIZE]
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, recipe_id=pk, created=created)
+                for pk, created in recipes
+            ),
+            ignore_conflicts=True
+        )
+
+    def rebuild(self):
+        ranked_sql, params = Recipe.objects.filter(
+            author__subscribers_count__lte=settings.FEED_FANOUT_MAX_SUBSCRIBERS
+        ).ranked_by_author().values(
+            'id', 'author_id', 'created', 'author_rank'
+        ).query.sql_with_params()
+        connection = connections[self.db]
+        ops = connection.ops
+        quote = ops.quote_name
+        columns = ', '.join(
+            quote(self.model._meta.get_field(name).column)
+            for name in ('user', 'recipe', 'created')
+        )
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            cursor.execute(
+                f'{ops.insert_statement(ignore_conflicts=True)} '
+                f'{quote(self.model._meta.db_table)} ({columns}) '
+                'SELECT subscription.subscriber_id, ranked.id, ranked.created '
+                f'FROM {quote(Subscription._meta.db_table)} subscription '
+                f'JOIN ({ranked_sql}) ranked '
+                'ON ranked.author_id = subscription.author_id '
+                'WHERE ranked.author_rank <= %s '
+                f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+                (*params, settings.FEED_BACKFILL_SIZE)
+            )
+
+    def forget_author(self, user_id, author_id):
+        self.filter(user_id=user_id, recipe__author_id=author_id).delete()
+
+    def timeline(self, user, position, limit):
+        entries = self.filter(user=user)
+        if position is not None:
+            entries = entries.filter(older_than(position, 'recipe_id'))
+        found = set(entries.order_by('-created', '-recipe_id').values_list(
+            'created', 'recipe_id'
+        )[:limit])
+        pull_author_ids = self.pull_author_ids(user)
+        if pull_author_ids:
+            recipes = Recipe.objects.filter(author_id__in=pull_author_ids)
+            if position is not None:
+                recipes = recipes.filter(older_than(position))
+            found.update(recipes.order_by('-created', '-id').values_list(
+                'created', 'id'
+            )[:limit])
+        return [pk for _, pk in sorted(found, reverse=True)[:limit]]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='feed',
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='feed_entries',
+        on_delete=models.CASCADE
+    )
+    created = models.DateTimeField(
+        verbose_name='Время и дата создания рецепта'
+    )
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ('-created', '-recipe_id')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created', '-recipe'],
+                name='feed_entry_timeline'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.recipe}'
@@ -1,4 +1,3 @@
-from django.contrib import admin
 from django.contrib.admin import register
 from django.contrib.auth.admin import UserAdmin
 
@@ -13,11 +12,3 @@ class UsersAdmin(UserAdmin):
     )
     search_fields = ('username', 'email')
     list_filter = ('username', 'email')
-
-    @admin.display(description='Колл-во подписчикоа')
-    def subscribers_count(self, obj):
-        return obj.subscription_author.count()
-
-    @admin.display(description='Колл-во рецептов')
-    def recipes_count(self, obj):
-        return obj.authored_recipes.count()
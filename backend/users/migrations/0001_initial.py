@@ -0,0 +1,67 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:47
+
+from django.conf import settings
+import django.contrib.auth.models
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('username', models.CharField(db_index=True, max_length=160, unique=True, validators=[django.core.validators.RegexValidator(regex='(?!me\\b)(^[\\w.@+-]+\\Z)')], verbose_name='Юзернейм пользователя')),
+                ('first_name', models.CharField(max_length=160, verbose_name='Имя пользователя')),
+                ('last_name', models.CharField(max_length=160, verbose_name='Фамилия пользователя')),
+                ('email', models.EmailField(max_length=160, unique=True, verbose_name='Электронная почта пользователя')),
+                ('password', models.CharField(max_length=160, verbose_name='Пароль пользователя')),
+                ('avatar', models.ImageField(blank=True, db_index=True, upload_to='users/', verbose_name='Аватар пользователя')),
+                ('avatar_variants', models.JSONField(blank=True, default=dict, editable=False, verbose_name='Варианты аватара пользователя')),
+                ('recipes_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во рецептов')),
+                ('subscribers_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во подписчиков')),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.Group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.Permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'Пользователь',
+                'verbose_name_plural': 'Пользователи',
+                'ordering': ('username',),
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Subscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscription_author', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('subscriber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscription_subscriber', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Подписка',
+                'verbose_name_plural': 'Подписки',
+                'ordering': ('author__username',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('author', 'subscriber'), name='unique_subs'),
+        ),
+    ]
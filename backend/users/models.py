@@ -8,6 +8,16 @@ FIRST_NAME_MAX_LENGTH = 160
 LAST_NAME_MAX_LENGTH = 160
 EMAIL_MAX_LENGTH = 160
 PASSWORD_MAX_LENGTH = 160
+USER_COUNTER_FIELDS = ('recipes_count', 'subscribers_count')
+
+
+def exclude_counters(instance, counter_fields, kwargs):
+    if not instance._state.adding and kwargs.get('update_fields') is None:
+        kwargs['update_fields'] = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in counter_fields
+        ]
+    return kwargs
 
 
 class User(AbstractUser):
@@ -39,8 +49,25 @@ class User(AbstractUser):
     avatar = models.ImageField(
         upload_to='users/',
         blank=True,
+        db_index=True,
         verbose_name='Аватар пользователя'
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Варианты аватара пользователя',
+        default=dict,
+        blank=True,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Кол-во рецептов',
+        default=0,
+        editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Кол-во подписчиков',
+        default=0,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'password']
@@ -53,6 +80,11 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        super().save(
+            *args, **exclude_counters(self, USER_COUNTER_FIELDS, kwargs)
+        )
+
 
 class Subscription(models.Model):
 